@@ -12,9 +12,6 @@
 #
 # REQUIRES: Python3 (tested under 3.8), weewx Version 4 (or later)
 #
-# Note:  I left ord(single-byte-value), though strictly speaking
-# it should probably be done as int(single-byte-value)
-#
 
 """Driver for Davis Weather Monitor II weather station, Should also work with
 Wizzard and Perception but hasn't been tested
@@ -22,16 +19,19 @@ Wizzard and Perception but hasn't been tested
 
 """
 
+import binascii
+import os
+import queue
+import random
 import serial
 import syslog
+import threading
 import time
-import datetime
 import struct
 import logging
 
 import weewx.drivers
 import weewx.wxformulas
-import weewx.crc16
 
 from weewx.units import INHG_PER_MBAR, MILE_PER_KM
 from weeutil.weeutil import timestamp_to_string
@@ -41,6 +41,28 @@ DRIVER_VERSION = "1.0"
 
 log = logging.getLogger(__name__)
 
+# Precompiled struct formats for the LOOP packet and the WRD/WWR memory words
+_LOOP_STRUCT = struct.Struct("<hhBhhBBhhh")
+# A whole 18 byte LOOP frame, header byte included
+_LOOP_FRAME_STRUCT = struct.Struct("<BhhBhhBBhhh")
+_BYTE_STRUCT = struct.Struct("<b")
+_WORD_STRUCT = struct.Struct("<h")
+_WORD_PAIR_STRUCT = struct.Struct("<hh")
+# WRD command frame: "WRD", (nibbles << 4 | bank), address, CR
+_WRD_STRUCT = struct.Struct("<3sBBB")
+# Bank selector values for memory bank 0 and 1
+_READ_BANKS = {0: 2, 1: 4}
+_WRITE_BANKS = {0: 1, 1: 3}
+# LOOP packet count, sent as 65536 - n (0xFFFF requests a single packet)
+_LOOP_COUNT_STRUCT = struct.Struct("<H")
+_LOOP_CMD = b"LOOP\xff\xff\r"
+_START_CMD = b"START\r"
+
+# BCD lookup tables: 0-99 to packed BCD, and any byte back to its decimal value
+_TO_BCD = bytes(((i // 10) << 4) | (i % 10) for i in range(100))
+_FROM_BCD = bytes((b >> 4) * 10 + (b & 0x0F) for b in range(256))
+
+
 def loader(config_dict, _):
     return WMII(**config_dict[DRIVER_NAME])
 
@@ -53,16 +75,16 @@ def confeditor_loader():
 #    log.info(level, "Weather Monitor II: %s" % msg)
 
 
-def logdbg(msg):
-    log.debug("Weather Monitor II: " + msg)
+def logdbg(msg, *args):
+    log.debug("Weather Monitor II: " + msg, *args)
 
 
-def loginf(msg):
-    log.info("Weather Monitor II: " + msg)
+def loginf(msg, *args):
+    log.info("Weather Monitor II: " + msg, *args)
 
 
-def logerr(msg):
-    log.error("Weather Monitor II: " + msg)
+def logerr(msg, *args):
+    log.error("Weather Monitor II: " + msg, *args)
 
 
 class WMII(weewx.drivers.AbstractDevice):
@@ -79,6 +101,28 @@ class WMII(weewx.drivers.AbstractDevice):
 
     max_tries - how often to retry serial communication before giving up
     [Optional. Default is 5]
+
+    retry_wait - upper bound (in seconds) of the wait between retries, which
+    starts at 0.1 and doubles after each failed attempt
+    [Optional. Default is 3]
+
+    min_cmd_gap - minimum time (in seconds) between consecutive memory
+    read/write commands, to let the console catch up
+    [Optional. Default is 0.1]
+
+    latency_timer - FTDI USB-serial latency timer (in milliseconds) to set
+    when the port is opened. 0 leaves the adapter setting untouched.
+    [Optional. Default is 1]
+
+    loop_batch - number of LOOP packets to request with each LOOP command.
+    With more than 1 the console paces the packets and loop_interval is not
+    used. The port is held for the whole batch, so clock and calibration
+    commands (e.g. from StdTimeSynch) wait for the batch to end, up to
+    loop_batch times the console's packet interval. Keep it small.
+    [Optional. Default is 1]
+
+    LOOP packets are read by a background thread and handed to genLoopPackets
+    through a short queue, so a slow consumer always gets the latest packet.
     """
 
     def __init__(self, **stn_dict):
@@ -87,15 +131,33 @@ class WMII(weewx.drivers.AbstractDevice):
         self.max_tries = int(stn_dict.get("max_tries", 5))
         self.retry_wait = int(stn_dict.get("retry_wait", 3))
         self.loop_interval = int(stn_dict.get("loop_interval", 1))
+        self.loop_batch = int(stn_dict.get("loop_batch", 1))
         debug_serial = int(stn_dict.get("debug_serial", 0))
+        min_cmd_gap = float(stn_dict.get("min_cmd_gap", 0.1))
+        latency_timer = int(stn_dict.get("latency_timer", 1))
         self.last_rain = None  # ?
-
-        loginf("driver version is %s" % DRIVER_VERSION)
-        loginf("using serial port %s" % self.port)
-        self.station = Station(self.port, debug_serial=debug_serial)
+        # Background reader state, see _reader()
+        self._queue = queue.Queue(maxsize=2)
+        self._thread = None
+
+        loginf("driver version is %s", DRIVER_VERSION)
+        loginf("using serial port %s", self.port)
+        self.station = Station(
+            self.port,
+            debug_serial=debug_serial,
+            min_cmd_gap=min_cmd_gap,
+            latency_timer=latency_timer,
+        )
+        # Setting this also cuts short the station's retry waits
+        self._stop = self.station.stop_event
         self.station.open()
 
     def closePort(self):
+        self._stop.set()
+        if self._thread is not None:
+            # At most one serial read is left to finish
+            self._thread.join()
+            self._thread = None
         if self.station is not None:
             self.station.close()
             self.station = None
@@ -111,33 +173,120 @@ class WMII(weewx.drivers.AbstractDevice):
         self.station.set_time(int(time.time()))
 
     def genLoopPackets(self):
-        while True:
-            packet = {"dateTime": int(time.time() + 0.5), "usUnits": weewx.US}
-            readings = self.station.get_readings_with_retry(
-                self.max_tries, self.retry_wait
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._reader, name="wmII-reader", daemon=True
             )
-            data = self.station.parse_readings(readings)
-            packet.update(data)
-            self._augment_packet(packet)
+            self._thread.start()
+        # Bind everything the loop touches up front
+        _US = weewx.US
+        get = self._queue.get
+        parse = self.station.parse_readings
+        augment = self._augment_packet
+        while True:
+            item = get()
+            if isinstance(item, Exception):
+                raise item
+            timestamp, raw = item
+            packet = {"dateTime": int(timestamp + 0.5), "usUnits": _US}
+            parse(raw, packet)
+            augment(packet)
             yield packet
-            time.sleep(self.loop_interval)
+
+    def _reader(self):
+        """Read LOOP packets until closePort and queue them, together with
+        the time they arrived. Errors are queued for genLoopPackets to raise.
+        """
+        station = self.station
+        max_tries, retry_wait = self.max_tries, self.retry_wait
+        if self.loop_batch > 1:
+            readings = station.stream_readings(self.loop_batch, max_tries, retry_wait)
+            interval = 0  # the console paces the stream
+        else:
+            get = station.get_readings_with_retry
+            readings = iter(lambda: get(max_tries, retry_wait), None)
+            interval = self.loop_interval
+        stopped, wait = self._stop.is_set, self._stop.wait
+        post, _time = self._post, time.time
+        monotonic = time.monotonic
+        next_wake = monotonic()
+        try:
+            while not stopped():
+                raw = next(readings)
+                # The station buffer is reused by the next read, so copy it
+                post((_time(), bytes(raw)))
+                if interval:
+                    # Sleep only what is left of the interval after the read
+                    next_wake += interval
+                    delay = next_wake - monotonic()
+                    if delay > 0:
+                        wait(delay)
+                    else:
+                        next_wake = monotonic()  # overran, start afresh
+        except Exception as e:
+            if not self._stop.is_set():
+                self._post(e)
+        finally:
+            if self.loop_batch > 1:
+                # Leave a batch in progress, which releases the station lock
+                readings.close()
+
+    def _post(self, item):
+        """Queue item, discarding the oldest entry if the consumer is behind."""
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
 
     def _augment_packet(self, packet):
-        packet["rain"] = weewx.wxformulas.calculate_rain(
-            packet["rain_total"], self.last_rain
-        )
-        self.last_rain = packet["rain_total"]
+        rain_total = packet["rain_total"]
+        packet["rain"] = weewx.wxformulas.calculate_rain(rain_total, self.last_rain)
+        self.last_rain = rain_total
 
 
 class Station(object):
     DEFAULT_PORT = "/dev/ttyUSB0"
+    # Read timeout while waiting for the console to send the next packet of a
+    # LOOP stream, which it paces itself
+    STREAM_TIMEOUT = 3  # seconds
 
-    def __init__(self, port, debug_serial=0):
+    def __init__(self, port, debug_serial=0, min_cmd_gap=0.1, latency_timer=1):
         self._debug_serial = debug_serial
         self.port = port
+        self.latency_timer = latency_timer
         self.baudrate = 2400
+        # Time allowed for the console to start answering a command. Its
+        # response latency is not documented, so keep the long-standing 2 s.
         self.timeout = 2  # seconds
+        # On Windows and other non-POSIX backends a gap of ~12 characters at
+        # 2400 baud ends a read early, and reads that expect more data carry
+        # on from there. pyserial's POSIX backend rounds it down to VTIME 0
+        # and reads until it has everything or timeout expires.
+        self.inter_byte_timeout = 0.05  # seconds
         self.serial_port = None
+        # LOOP packet buffer (header + payload + CRC), reused for every read
+        self._loop_buf = bytearray(18)
+        self._loop_view = memoryview(self._loop_buf)
+        self._ack_buf = bytearray(1)
+        # LOOP packets passed over by the last resynchronising read
+        self.skipped_packets = 0
+        # Held for every exchange with the console, so that commands from
+        # another thread never interleave with a LOOP request or stream
+        self.lock = threading.RLock()
+        # Set to abandon reading; retries then stop instead of waiting
+        self.stop_event = threading.Event()
+        # WRD frames and WWR prefixes, keyed by (command, n, bank, addr)
+        self._cmd_cache = {}
+        # Minimum gap (seconds) between the end of one memory command and the
+        # start of the next, for the console to catch up
+        self.cmd_gap = min_cmd_gap
+        self._last_cmd = 0.0
         # Calibrations
         self.tp1cal = 0
         self.tp2cal = 0
@@ -146,6 +295,7 @@ class Station(object):
         self.hm2cal = 0
         self.barcal = 0
         self.windcal = 1600
+        self._update_cal_factors()
 
     def __enter__(self):
         self.open()
@@ -155,114 +305,187 @@ class Station(object):
         self.close()
 
     def open(self):
-        logdbg("open serial port %s" % self.port)
-        self.serial_port = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+        logdbg("open serial port %s", self.port)
+        self.serial_port = serial.Serial(
+            self.port,
+            self.baudrate,
+            timeout=self.timeout,
+            inter_byte_timeout=self.inter_byte_timeout,
+            exclusive=True,
+        )
+        try:
+            # Sets ASYNC_LOW_LATENCY on Linux, same as setserial low_latency;
+            # pyserial raises NotImplementedError on other platforms
+            self.serial_port.set_low_latency_mode(True)
+        except (AttributeError, NotImplementedError, ValueError, IOError) as e:
+            logdbg("low latency mode not available on %s: %s", self.port, e)
+        if self.latency_timer:
+            self._set_latency_timer(self.latency_timer)
+
+    def _set_latency_timer(self, ms):
+        """FTDI adapters hold short reads for up to 16 ms by default. Lower
+        the latency timer through sysfs when the port is a USB-serial device.
+        """
+        tty = os.path.basename(os.path.realpath(self.port))
+        path = "/sys/bus/usb-serial/devices/%s/latency_timer" % tty
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "wb") as f:
+                f.write(b"%d" % ms)
+            loginf("set latency_timer of %s to %d ms", tty, ms)
+        except (IOError, OSError) as e:
+            loginf("unable to set latency_timer of %s: %s", tty, e)
 
     def close(self):
         if self.serial_port is not None:
-            logdbg("close serial port %s" % self.port)
+            logdbg("close serial port %s", self.port)
             self.serial_port.close()
             self.serial_port = None
 
     def get_time(self):
-        d = self.ReadWRD(6, 1, 0xBE)
-        hour = self.fromBCD(ord(d[0:1]))
-        min = self.fromBCD(ord(d[1:2]))
-        sec = self.fromBCD(ord(d[2:3]))
-        d = self.ReadWRD(3, 1, 0xC8)
-        day = self.fromBCD(ord(d[0:1]))
-        month = ord(d[1:2])
-        logdbg("station time: month:%s day:%s %s:%s:%s" % (month, day, hour, min, sec))
-        year = datetime.datetime.now().year
-        dt = datetime.datetime(year, month, day, hour, min, sec)
-        station_time = time.mktime(dt.timetuple())
-        return station_time
+        with self.lock:
+            d = self.ReadWRD(6, 1, 0xBE)
+            hour = self.fromBCD(d[0])
+            min = self.fromBCD(d[1])
+            sec = self.fromBCD(d[2])
+            d = self.ReadWRD(3, 1, 0xC8)
+            day = self.fromBCD(d[0])
+            month = d[1]
+            logdbg("station time: month:%s day:%s %s:%s:%s", month, day, hour, min, sec)
+            # The station keeps no year. Around New Year the console may still be
+            # in December while the computer is already in January.
+            now = time.localtime()
+            year = now.tm_year
+            if month > now.tm_mon:
+                year -= 1
+            station_time = time.mktime((year, month, day, hour, min, sec, 0, 0, -1))
+            return station_time
 
     def set_time(self, t):
-        self.get_time()
-        (year, month, day, hour, min, sec, d, d, d) = time.localtime(t)
-        logdbg("Attempting to set Station's Time...")
-        self.WriteWRD(
-            6,
-            1,
-            0xBE,
-            (chr(self.toBCD(hour)) + chr(self.toBCD(min)) + 
-               chr(self.toBCD(sec))).encode('utf-8')
-        )
-        logdbg("set station time = %s:%s:%s" % (hour, min, sec))
-        logdbg("Attempting to set Station's Date")
-        self.WriteWRD(3, 1, 0xC8, 
-            (chr(self.toBCD(day)) + chr(month)).encode('utf-8'))
-        logdbg("set station date = mont:%s day:%s" % (month, day))
+        with self.lock:
+            self.get_time()
+            (year, month, day, hour, min, sec, d, d, d) = time.localtime(t)
+            logdbg("Attempting to set Station's Time...")
+            self.WriteWRD(
+                6,
+                1,
+                0xBE,
+                bytes((self.toBCD(hour), self.toBCD(min), self.toBCD(sec))),
+            )
+            logdbg("set station time = %s:%s:%s", hour, min, sec)
+            logdbg("Attempting to set Station's Date")
+            self.WriteWRD(3, 1, 0xC8, bytes((self.toBCD(day), month)))
+            logdbg("set station date = mont:%s day:%s", month, day)
 
     def get_acknowledge(self):
-        c = self.serial_port.read(1)
-        if len(c) == 0:
-            raise weewx.WeeWxIOError("Acknowledge returned empty: %s" % c)
+        c = self._ack_buf
+        if not self.serial_port.readinto(c):
+            raise weewx.WeeWxIOError("Acknowledge returned empty")
         ACK = 6
-        if ord(c) != ACK:
-            raise weewx.WeeWxIOError("Acknowledge not equal 6: %s" % c)
+        if c[0] != ACK:
+            raise weewx.WeeWxIOError("Acknowledge not equal 6: %s" % bytes(c))
 
     def ReadWRD(self, n, bank, addr):
-        if bank == 0:
-            bankval = 2
-        elif bank == 1:
-            bankval = 4
-        self.serial_port.write(b'WRD' + ((n << 4) | bankval).to_bytes(1,'little') +
-           (addr & 0x00ff).to_bytes(1,'little') + b'\r')
-        self.get_acknowledge()
-        data = self.serial_port.read(int((n + 1) / 2))
-        return data
+        key = (b"WRD", n, bank, addr)
+        cmd = self._cmd_cache.get(key)
+        if cmd is None:
+            try:
+                bankval = _READ_BANKS[bank]
+            except KeyError:
+                raise ValueError("invalid bank %s" % bank)
+            cmd = _WRD_STRUCT.pack(b"WRD", (n << 4) | bankval, addr & 0x00FF, 0x0D)
+            self._cmd_cache[key] = cmd
+        self._pace()
+        self.serial_port.reset_input_buffer()  # drop stale bytes
+        self.serial_port.write(cmd)
+        # Read the ACK and the data in one go
+        size = 1 + (n + 1) // 2
+        resp = self.serial_port.read(size)
+        if not resp:
+            raise weewx.WeeWxIOError("Acknowledge returned empty")
+        if resp[0] != 6:
+            raise weewx.WeeWxIOError("Acknowledge not equal 6: %s" % resp[0:1])
+        if len(resp) < size:
+            # the console paused between the ACK and the data (only seen
+            # where inter_byte_timeout applies)
+            resp += self.serial_port.read(size - len(resp))
+        if len(resp) != size:
+            raise weewx.WeeWxIOError(
+                "Invalid Length of WRD response: len %d" % (len(resp) - 1)
+            )
+        self._last_cmd = time.monotonic()
+        return resp[1:]
 
     def ReadByte(self, bank, addr):
-        bytes = self.ReadWRD(2, bank, addr)
-        rec = struct.unpack("<b", bytes)
-        n = rec[0]
-        return n
+        return _BYTE_STRUCT.unpack(self.ReadWRD(2, bank, addr))[0]
+
+    def _pace(self):
+        """Wait out whatever is left of the gap since the previous command."""
+        delay = self.cmd_gap - (time.monotonic() - self._last_cmd)
+        if delay > 0:
+            time.sleep(delay)
 
     def ReadWord(self, bank, addr):
-        time.sleep(1)  # Time between consecutive calls for console to catch up
-        bytes = self.ReadWRD(4, bank, addr)
-        rec = struct.unpack("<h", bytes)
-        n = rec[0]
-        return n
+        return _WORD_STRUCT.unpack(self.ReadWRD(4, bank, addr))[0]
 
     def WriteWord(self, bank, addr, n):
-        time.sleep(1)  # Time between consecutive calls for console to catch up
-        bytes = struct.pack("<h", n)
-        self.WriteWRD(4, bank, addr, bytes)
+        self.WriteWRD(4, bank, addr, _WORD_STRUCT.pack(n))
+
+    def ReadWordPair(self, bank, addr):
+        """Read two adjacent words (8 nibbles) in a single WRD command."""
+        return _WORD_PAIR_STRUCT.unpack(self.ReadWRD(8, bank, addr))
+
+    def WriteWordPair(self, bank, addr, n1, n2):
+        """Write two adjacent words (8 nibbles) in a single WWR command."""
+        self.WriteWRD(8, bank, addr, _WORD_PAIR_STRUCT.pack(n1, n2))
 
     def WriteWRD(self, n, bank, addr, data):
-        if bank == 0:
-            bankval = 1
-        elif bank == 1:
-            bankval = 3
+        key = (b"WWR", n, bank, addr)
+        prefix = self._cmd_cache.get(key)
+        if prefix is None:
+            try:
+                bankval = _WRITE_BANKS[bank]
+            except KeyError:
+                raise ValueError("invalid bank %s" % bank)
+            prefix = b"WWR" + bytes(((n << 4) | bankval, addr & 0x00FF))
+            self._cmd_cache[key] = prefix
         #  Assumes being passed *bytes* not a *string*
-        self.serial_port.write(b'WWR' + ((n << 4) | bankval).to_bytes(1,'little') +
-           (addr & 0x00ff).to_bytes(1,'little') + data + b'\r')
+        self._pace()
+        self.serial_port.reset_input_buffer()  # drop stale bytes
+        self.serial_port.write(prefix + data + b"\r")
         self.get_acknowledge()
+        self._last_cmd = time.monotonic()
 
     def SendSTART(self):
         # self.serial_port.write(b'START' + chr(0x0D))
-        self.serial_port.write(b'START\r')
+        self.serial_port.reset_input_buffer()  # drop stale bytes
+        self.serial_port.write(_START_CMD)
         self.get_acknowledge()
 
-    def SendLOOP(self):
+    def SendLOOP(self, n=1):
         # self.serial_port.write(b'LOOP' + chr(255) + chr(255) + chr(0x0D))
-        self.serial_port.write(b'LOOP\xff\xff\r')
+        if n == 1:
+            cmd = _LOOP_CMD
+        else:
+            cmd = b"LOOP" + _LOOP_COUNT_STRUCT.pack(0x10000 - n) + b"\r"
+        self.serial_port.reset_input_buffer()  # drop stale bytes
+        self.serial_port.write(cmd)
         self.get_acknowledge()
 
     def GetCalibration(self):
-        self.tp1cal = self.ReadWord(1, 0x0152)
-        self.tp2cal = self.ReadWord(1, 0x0178)
-        self.rncal = self.ReadWord(1, 0x01D6)
-        self.hm1cal = 0
-        self.hm2cal = self.ReadWord(1, 0x01DA)
-        self.barcal = self.ReadWord(1, 0x012C)
-        self.windcal = 1600
-        logdbg(
-            "Station Calibrations: inTemp:%d, outTemp:%d, rain:%d, inHum:%d, outHum:%d, pressure:%d, wind:%d"
-            % (
+        with self.lock:
+            self.tp1cal = self.ReadWord(1, 0x0152)
+            self.tp2cal = self.ReadWord(1, 0x0178)
+            # Rain (0x01D6) and outside humidity (0x01DA) calibrations are adjacent
+            self.rncal, self.hm2cal = self.ReadWordPair(1, 0x01D6)
+            self.hm1cal = 0
+            self.barcal = self.ReadWord(1, 0x012C)
+            self.windcal = 1600
+            self._update_cal_factors()
+            logdbg(
+                "Station Calibrations: inTemp:%d, outTemp:%d, rain:%d, inHum:%d, "
+                "outHum:%d, pressure:%d, wind:%d",
                 self.tp1cal,
                 self.tp2cal,
                 self.rncal,
@@ -271,51 +494,165 @@ class Station(object):
                 self.barcal,
                 self.windcal,
             )
-        )
+
+    def _update_cal_factors(self):
+        """Precompute the scale factors parse_readings multiplies by."""
+        self._k_wind = 1600.0 / self.windcal
+        self._k_rain = 1.0 / self.rncal
 
     def SetCalibration(self, tp1cal, tp2cal, rncal, h2mcal, barcal):
-        self.WriteWord(1, 0x0152, tp1cal)
-        self.WriteWord(1, 0x0178, tp2cal)
-        self.WriteWord(1, 0x01D6, rncal)
-        self.WriteWord(1, 0x01DA, h2mcal)
-        self.WriteWord(1, 0x012C, barcal)
+        with self.lock:
+            self.WriteWord(1, 0x0152, tp1cal)
+            self.WriteWord(1, 0x0178, tp2cal)
+            self.WriteWordPair(1, 0x01D6, rncal, h2mcal)
+            self.WriteWord(1, 0x012C, barcal)
 
     def get_readings(self):
-        self.SendLOOP()
-        c = self.serial_port.read(1)
-        if not c:
-            raise weewx.WeeWxIOError("Invalid header: %s" % c)
-        if ord(c) != 1:
-            raise weewx.WeeWxIOError("Invalid header: %s" % c)
-        buf = self.serial_port.read(17)
-        if len(buf) != 17:
+        """Request a single LOOP packet and return it (see read_next_loop)."""
+        with self.lock:
+            self.start_loop_stream(1)
+            return self.read_next_loop()
+
+    def start_loop_stream(self, n):
+        """Ask the console to send the next n LOOP packets."""
+        self.SendLOOP(n)
+
+    def read_next_loop(self, resync=False):
+        """Read one LOOP packet into the station's packet buffer and return it.
+
+        The returned buffer is reused by the next call, so it must be parsed
+        before reading again. With resync, a bad packet in a LOOP stream is
+        recovered by scanning the following bytes for the next header, and
+        skipped_packets is set to the number of packets this passed over.
+        """
+        buf = self._loop_buf
+        size = len(buf)
+        n = self.serial_port.readinto(self._loop_view)
+        while 0 < n < size:
+            # the console paused mid-packet, read the rest (only seen where
+            # inter_byte_timeout applies)
+            got = self.serial_port.readinto(self._loop_view[n:])
+            if not got:
+                break
+            n += got
+        if resync:
+            n, dropped = self._resync_loop(n)
+            # A corrupt packet costs its own 18 bytes, a stray byte does not
+            # cost a packet
+            self.skipped_packets = (dropped + size // 2) // size
+        if not n or buf[0] != 1:
+            raise weewx.WeeWxIOError("Invalid header: %s" % bytes(buf[0:n and 1]))
+        if n != 18:
             raise weewx.WeeWxIOError(
-                "Invalid Length of Loop response: len %d" % len(buf)
+                "Invalid Length of Loop response: len %d" % (n - 1)
             )
-        if weewx.crc16.crc16(buf):  # CRC_checksum
+        # CRC-16/XMODEM over payload + CRC is zero for an intact packet
+        if binascii.crc_hqx(self._loop_view[1:], 0):
             raise weewx.WeeWxIOError("CRC Checksum error")
         return buf
 
+    def _resync_loop(self, n):
+        """Slide the packet buffer up to the next 0x01 header and read in the
+        bytes that follow, until it holds a packet that passes its CRC. Gives
+        up on a short read or after one packet's worth of attempts. Returns
+        the number of bytes in the buffer and the number of bytes dropped.
+        """
+        buf = self._loop_buf
+        payload = self._loop_view[1:]
+        size = len(buf)
+        dropped = 0
+        for _ in range(size):
+            if n != size or (buf[0] == 1 and not binascii.crc_hqx(payload, 0)):
+                break
+            i = buf.find(b"\x01", 1)
+            if i < 0:
+                i = size
+            keep = size - i
+            buf[:keep] = buf[i:]
+            n = keep + self.serial_port.readinto(self._loop_view[keep:])
+            dropped += i
+            logdbg("dropped %d bytes to resynchronise the LOOP stream", i)
+        return n, dropped
+
+    def _backoff(self, delay, retry_wait):
+        """Sleep delay plus up to 10% jitter and return the next delay, doubled
+        and capped at retry_wait. Raises if stop_event is set meanwhile."""
+        wait = delay + random.uniform(0, delay * 0.1)
+        logdbg("retrying in %.2f s", wait)
+        if self.stop_event.wait(wait):
+            raise weewx.WeeWxIOError("Stopped while retrying readings")
+        return min(delay * 2, retry_wait)
+
     def get_readings_with_retry(self, max_tries=5, retry_wait=3):
-        for ntries in range(0, max_tries):
+        delay = min(0.1, retry_wait)
+        for ntries in range(max_tries):
             try:
                 buf = self.get_readings()
                 return buf
             except (serial.serialutil.SerialException, weewx.WeeWxIOError) as e:
                 loginf(
-                    "Failed attempt %d of %d to get readings: %s"
-                    % (ntries + 1, max_tries, e)
+                    "Failed attempt %d of %d to get readings: %s",
+                    ntries + 1,
+                    max_tries,
+                    e,
                 )
-                time.sleep(retry_wait)
+                delay = self._backoff(delay, retry_wait)
         else:
             msg = "Max retries (%d) exceeded for readings" % max_tries
             logerr(msg)
             raise weewx.RetriesExceeded(msg)
 
-    def parse_readings(self, raw):
+    def stream_readings(self, batch, max_tries=5, retry_wait=3):
+        """Yield LOOP packets, requesting them from the console batch at a
+        time. A bad packet restarts the stream; max_tries consecutive failures
+        raise RetriesExceeded.
+
+        The station lock is held from the LOOP request to the last packet of
+        each batch, also while suspended at yield, so other commands wait for
+        the batch to end. Close the generator to give up a batch early.
+        """
+        failures = 0
+        delay = min(0.1, retry_wait)
+        while True:
+            # The console keeps sending until the batch is done, so hold the
+            # port for the whole batch; other commands run between batches
+            with self.lock:
+                try:
+                    self.start_loop_stream(batch)
+                    self.serial_port.timeout = self.STREAM_TIMEOUT
+                    remaining = batch
+                    while remaining > 0:
+                        buf = self.read_next_loop(resync=True)
+                        # packets lost to a resync are not coming again
+                        remaining -= 1 + self.skipped_packets
+                        failures = 0
+                        delay = min(0.1, retry_wait)
+                        yield buf
+                    error = None
+                except (serial.serialutil.SerialException, weewx.WeeWxIOError) as e:
+                    error = e
+                finally:
+                    if self.serial_port is not None:
+                        self.serial_port.timeout = self.timeout
+            if error is None:
+                continue
+            failures += 1
+            loginf(
+                "Failed attempt %d of %d to get readings: %s",
+                failures,
+                max_tries,
+                error,
+            )
+            if failures >= max_tries:
+                msg = "Max retries (%d) exceeded for readings" % max_tries
+                logerr(msg)
+                raise weewx.RetriesExceeded(msg)
+            delay = self._backoff(delay, retry_wait)
+
+    def parse_readings(self, raw, packet=None):
         """Davis Weather Monitor II stations emit data in an 18 bytes package.
         the data is in the following order:
-        1 byte  = header ---> 0x01 (checked and removed by get_readings)
+        1 byte  = header ---> 0x01 (checked by read_next_loop and skipped here)
         2 bytes = inTemp
         2 bytes = outTemp
         1 byte  = windSpeed
@@ -326,37 +663,76 @@ class Station(object):
         2 bytes = rain_total ---> rain calibration = 100
         2 bytes = not_used
         2 bytes = CRC_checksum
+
+        The observations are stored into packet (a new dict if not given),
+        which is returned.
+        """
+        if len(raw) != 18:
+            raise weewx.WeeWxIOError("Invalid Length of Loop packet: len %d" % len(raw))
+        (inTemp, outTemp, windSpeed, windDir, pressure,
+         inHumidity, outHumidity, rain_total, _, _) = _LOOP_STRUCT.unpack_from(raw, 1)
+        if packet is None:
+            packet = dict()
+        packet["windSpeed"] = windSpeed * self._k_wind  # mph
+        packet["windDir"] = windDir  # compass deg
+        packet["outTemp"] = (outTemp + self.tp2cal) / 10.0  # degree_F
+        packet["rain_total"] = rain_total * self._k_rain  # inch
+        packet["pressure"] = (pressure + self.barcal) / 1000.0  # inHg
+        packet["inTemp"] = (inTemp + self.tp1cal) / 10.0  # degree_F
+        packet["outHumidity"] = outHumidity + self.hm2cal  # percent
+        packet["inHumidity"] = inHumidity + self.hm1cal  # percent
+        logdbg("station data: %s", packet)
+        return packet
+
+    def parse_readings_batch(self, blob):
+        """Decode a run of concatenated 18 byte LOOP packets, as returned by
+        read_next_loop, e.g. when replaying station data saved with --record.
+        Every packet's header and CRC are checked.
+
+        Returns a dict with one list per observation, in packet order.
         """
-        if len(raw) != 17:
-            warn("wrong size", len(raw))
-        buf = struct.unpack("<hhBhhBBhhh", raw)
-        data = dict()
-        data["windSpeed"] = (buf[2] * 1600.0) / self.windcal  # mph
-        data["windDir"] = buf[3]  # compass deg
-        data["outTemp"] = (buf[1] + self.tp2cal) / 10.0  # degree_F
-        data["rain_total"] = buf[7] / (1.0 * self.rncal)  # inch
-        data["pressure"] = (buf[4] + self.barcal) / 1000.0  # inHg
-        data["inTemp"] = (buf[0] + self.tp1cal) / 10.0  # degree_F
-        data["outHumidity"] = buf[6] + self.hm2cal  # percent
-        data["inHumidity"] = buf[5] + self.hm1cal  # percent
-        data["rain_total"] = buf[7] / (1.0 * self.rncal)
-        logdbg("station data: %s" % data)
-        return data
+        size = _LOOP_FRAME_STRUCT.size
+        if len(blob) % size:
+            raise weewx.WeeWxIOError(
+                "Invalid length of LOOP batch: len %d" % len(blob)
+            )
+        view = memoryview(blob)
+        for i in range(0, len(blob), size):
+            if view[i] != 1:
+                raise weewx.WeeWxIOError(
+                    "Invalid header in LOOP batch at offset %d" % i
+                )
+            if binascii.crc_hqx(view[i + 1:i + size], 0):
+                raise weewx.WeeWxIOError(
+                    "Invalid CRC in LOOP batch at offset %d" % i
+                )
+        fields = list(zip(*_LOOP_FRAME_STRUCT.iter_unpack(blob)))
+        if not fields:
+            fields = [()] * 11
+        (_, inTemp, outTemp, windSpeed, windDir, pressure,
+         inHumidity, outHumidity, rain_total, _, _) = fields
+        wind_k = self._k_wind
+        rain_k = self._k_rain
+        return {
+            "windSpeed": [v * wind_k for v in windSpeed],  # mph
+            "windDir": list(windDir),  # compass deg
+            "outTemp": [(v + self.tp2cal) / 10.0 for v in outTemp],  # degree_F
+            "rain_total": [v * rain_k for v in rain_total],  # inch
+            "pressure": [(v + self.barcal) / 1000.0 for v in pressure],  # inHg
+            "inTemp": [(v + self.tp1cal) / 10.0 for v in inTemp],  # degree_F
+            "outHumidity": [v + self.hm2cal for v in outHumidity],  # percent
+            "inHumidity": [v + self.hm1cal for v in inHumidity],  # percent
+        }
 
     @staticmethod
     def toBCD(n):
-        if n < 0 or n > 99:
-            return 0
-        n1 = int(n / 10)
-        n2 = n % 10
-        m = n1 << 4 | n2
-        return m
+        if 0 <= n <= 99:
+            return _TO_BCD[n]
+        return 0
 
     @staticmethod
     def fromBCD(n):
-        n1 = n & 0x0F
-        n2 = n >> 4
-        return n2 * 10 + n1
+        return _FROM_BCD[n]
 
 
 class WMIIConfEditor(weewx.drivers.AbstractConfEditor):
@@ -375,6 +751,10 @@ class WMIIConfEditor(weewx.drivers.AbstractConfEditor):
     # [Optional. Defaul is 1]
     loop_interval = 1
 
+    # FTDI USB-serial latency timer (in milliseconds), 0 leaves it untouched.
+    # [Optional. Default is 1]
+    latency_timer = 1
+
     # The driver to use:
     driver = user.wmII
 
@@ -429,6 +809,14 @@ if __name__ == "__main__":
         "--settime",dest="settime",action="store_true",
         help="Get, set and then get the current time from the station"
     )
+    parser.add_option(
+        "--record", dest="record", metavar="FILE",
+        help="append the raw LOOP packets read to FILE"
+    )
+    parser.add_option(
+        "--replay", dest="replay", metavar="FILE",
+        help="decode the LOOP packets saved with --record in FILE and exit"
+    )
 
     (options, args) = parser.parse_args()
 
@@ -436,20 +824,27 @@ if __name__ == "__main__":
         print("Weather Monitor II driver version %s" % DRIVER_VERSION)
         exit(0)
 
+    if options.replay:
+        # No console is needed, so the readings use the default calibration
+        with open(options.replay, "rb") as f:
+            print(Station(options.port).parse_readings_batch(f.read()))
+        exit(0)
+
+    record = open(options.record, "ab") if options.record else None
     with Station(options.port, debug_serial=options.debug) as station:
         if options.gettime or options.settime:
-           print('Retrieving Station Time (1)')
-           stationTime = station.get_time()
-           print('Station Time: ' + 
-              time.asctime(time.localtime(stationTime)))
-           if options.settime:
-              print('Setting station Time...')
-              station.set_time(stationTime)
-              print('Retrieving Station Time (2)')
-              stationTime = station.get_time() 
-              print('Station Time: ' + 
-                 time.asctime(time.localtime(stationTime)))
+            print("Retrieving Station Time (1)")
+            stationTime = station.get_time()
+            print("Station Time: " + time.asctime(time.localtime(stationTime)))
+            if options.settime:
+                print("Setting station Time...")
+                station.set_time(stationTime)
+                print("Retrieving Station Time (2)")
+                stationTime = station.get_time()
+                print("Station Time: " + time.asctime(time.localtime(stationTime)))
         while True:
-            print(
-                time.time(), station.parse_readings(station.get_readings_with_retry())
-            )
+            raw = station.get_readings_with_retry()
+            if record is not None:
+                record.write(raw)
+                record.flush()
+            print(time.time(), station.parse_readings(raw))